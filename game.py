@@ -1,9 +1,29 @@
+import atexit
+import bisect
+import collections
+import contextlib
+import gzip
+import heapq
+import json
+import math
+import os
+import queue
 import random
+import struct
+import sys
+import threading
+import time
+import zlib
+
+import numpy as np
+import pygame
+from pgzero import ptext
 from pgzero.actor import Actor
+from pgzero.loaders import images
 from pygame import Rect
 
 TILE_SIZE = 32
-MAP_PATH = "map.txt"
+MAP_PATH = os.environ.get("SKYBOUND_MAP", "map.txt")
 SOLID_CHARS = {"1"}
 
 
@@ -106,9 +126,292 @@ def load_level(path):
         "solid_tiles": solid_tiles,
         "hero_spawn": hero_spawn,
         "enemy_spawns": enemy_spawns,
+        "top_segments": top_segments,
     }
 
 
+def fall_time(drop, start_vy, gravity, max_fall_speed):
+    cap_time = max(0.0, (max_fall_speed - start_vy) / gravity)
+    cap_drop = start_vy * cap_time + gravity * cap_time * cap_time / 2
+    if drop > cap_drop:
+        return cap_time + (drop - cap_drop) / max_fall_speed
+    discriminant = start_vy * start_vy + 2 * gravity * drop
+    if discriminant < 0:
+        return None
+    return (-start_vy + math.sqrt(discriminant)) / gravity
+
+
+def fall_distance(elapsed, start_vy, gravity, max_fall_speed):
+    cap_time = max(0.0, (max_fall_speed - start_vy) / gravity)
+    if elapsed <= cap_time:
+        return start_vy * elapsed + gravity * elapsed * elapsed / 2
+    cap_drop = start_vy * cap_time + gravity * cap_time * cap_time / 2
+    return cap_drop + (elapsed - cap_time) * max_fall_speed
+
+
+class NavGraph:
+    def __init__(
+        self,
+        segments,
+        speed,
+        jump_speed,
+        gravity,
+        max_fall_speed,
+        body_size,
+        solid_tiles,
+        cache_size=32,
+    ):
+        self.speed = speed
+        self.jump_speed = jump_speed
+        self.gravity = gravity
+        self.max_fall_speed = max_fall_speed
+        self.half_width = body_size[0] / 2
+        self.body_height = body_size[1]
+        self.solids = set(solid_tiles)
+        self.cache_size = cache_size
+        self.segments = []
+        self.surface_index = {}
+        self.rows = {}
+        for segment in segments:
+            rect = segment["rect"]
+            index = len(self.segments)
+            self.segments.append(
+                {
+                    "row": segment["row"],
+                    "rect": rect,
+                    "left": rect.left,
+                    "right": rect.right,
+                    "top": rect.top,
+                    "center": rect.centerx,
+                }
+            )
+            self.rows.setdefault(segment["row"], []).append(index)
+            for col in range(segment["start"], segment["start"] + segment["length"]):
+                self.surface_index[(segment["row"], col)] = index
+        self.row_rights = {}
+        for row, indices in self.rows.items():
+            indices.sort(key=lambda index: self.segments[index]["left"])
+            self.row_rights[row] = [self.segments[index]["right"] for index in indices]
+        self.edges = [[] for _ in self.segments]
+        self.reverse_edges = [[] for _ in self.segments]
+        self.searches = collections.OrderedDict()
+        self.pending = collections.deque()
+        apex = jump_speed * jump_speed / (2 * gravity)
+        self.jump_rows = int(apex // TILE_SIZE)
+        for index in range(len(self.segments)):
+            self.add_fall_edges(index)
+            self.add_jump_edges(index)
+        for source, edges in enumerate(self.edges):
+            for edge in edges:
+                self.reverse_edges[edge["target"]].append((source, edge))
+
+    def segments_between(self, row, low, high):
+        indices = self.rows.get(row)
+        if not indices:
+            return
+        position = bisect.bisect_right(self.row_rights[row], low)
+        while position < len(indices):
+            index = indices[position]
+            if self.segments[index]["left"] >= high:
+                return
+            yield index
+            position += 1
+
+    def box_blocked(self, left, top, right, bottom):
+        solids = self.solids
+        cols = range(int(left // TILE_SIZE), math.ceil(right / TILE_SIZE))
+        for row in range(int(top // TILE_SIZE), math.ceil(bottom / TILE_SIZE)):
+            for col in cols:
+                if (col, row) in solids:
+                    return True
+        return False
+
+    def path_clear(self, takeoff_x, start_y, vx, vy, airtime):
+        final_drop = fall_distance(airtime, vy, self.gravity, self.max_fall_speed)
+        travel = abs(vx) * airtime + abs(final_drop)
+        if vy < 0:
+            travel += vy * vy / self.gravity
+        steps = max(2, math.ceil(travel / TILE_SIZE))
+        for step in range(1, steps):
+            elapsed = airtime * step / steps
+            x = takeoff_x + vx * elapsed
+            drop = fall_distance(elapsed, vy, self.gravity, self.max_fall_speed)
+            bottom = start_y + drop
+            if self.box_blocked(
+                x - self.half_width,
+                bottom - self.body_height,
+                x + self.half_width,
+                bottom,
+            ):
+                return False
+        return True
+
+    def add_edge(self, source, target, kind, takeoff_x, landing_x, start_vy, airtime):
+        segment = self.segments[source]
+        vx = (landing_x - takeoff_x) / airtime
+        if not self.path_clear(takeoff_x, segment["top"], vx, start_vy, airtime):
+            return False
+        walk = abs(takeoff_x - segment["center"]) / self.speed
+        edge = {
+            "target": target,
+            "kind": kind,
+            "takeoff_x": takeoff_x,
+            "landing_x": landing_x,
+            "vx": vx,
+            "vy": start_vy,
+            "cost": walk + airtime,
+        }
+        self.edges[source].append(edge)
+        return True
+
+    def add_fall_edges(self, source):
+        segment = self.segments[source]
+        max_row = max(self.rows)
+        for direction in (-1, 1):
+            edge_x = segment["right"] if direction > 0 else segment["left"]
+            takeoff_x = edge_x + direction * self.half_width
+            if direction > 0:
+                below_col = int(edge_x // TILE_SIZE)
+            else:
+                below_col = int(edge_x // TILE_SIZE) - 1
+            for row in range(segment["row"] + 1, max_row + 1):
+                drop = row * TILE_SIZE - segment["top"]
+                airtime = fall_time(drop, 0.0, self.gravity, self.max_fall_speed)
+                far = takeoff_x + direction * self.speed * airtime
+                low, high = min(takeoff_x, far), max(takeoff_x, far)
+                landed = False
+                for target in self.segments_between(
+                    row, low - self.half_width, high + self.half_width
+                ):
+                    other = self.segments[target]
+                    left = max(low, other["left"] + self.half_width)
+                    right = min(high, other["right"] - self.half_width)
+                    if left > right:
+                        continue
+                    landing_x = max(left, min(other["center"], right))
+                    covers = other["left"] <= below_col * TILE_SIZE < other["right"]
+                    kind = "drop" if covers else "walk"
+                    landed |= self.add_edge(
+                        source, target, kind, takeoff_x, landing_x, 0.0, airtime
+                    )
+                if landed or (below_col, row) in self.solids:
+                    break
+
+    def add_jump_edges(self, source):
+        segment = self.segments[source]
+        takeoff_left = segment["left"] + self.half_width
+        takeoff_right = segment["right"] - self.half_width
+        if takeoff_left > takeoff_right:
+            return
+        for row in range(segment["row"] - self.jump_rows, segment["row"] + 1):
+            drop = row * TILE_SIZE - segment["top"]
+            airtime = fall_time(
+                drop, -self.jump_speed, self.gravity, self.max_fall_speed
+            )
+            if airtime is None:
+                continue
+            reach = self.speed * airtime
+            for target in self.segments_between(
+                row, segment["left"] - reach, segment["right"] + reach
+            ):
+                if target == source:
+                    continue
+                other = self.segments[target]
+                if other["left"] >= segment["right"]:
+                    landing_x = other["left"] + self.half_width
+                    takeoff_x = takeoff_right
+                    if drop < 0:
+                        takeoff_x = min(takeoff_x, other["left"] - self.half_width)
+                elif other["right"] <= segment["left"]:
+                    landing_x = other["right"] - self.half_width
+                    takeoff_x = takeoff_left
+                    if drop < 0:
+                        takeoff_x = max(takeoff_x, other["right"] + self.half_width)
+                elif drop < 0 and other["left"] - self.half_width >= takeoff_left:
+                    landing_x = other["left"] + self.half_width
+                    takeoff_x = other["left"] - self.half_width
+                elif drop < 0 and other["right"] + self.half_width <= takeoff_right:
+                    landing_x = other["right"] - self.half_width
+                    takeoff_x = other["right"] + self.half_width
+                else:
+                    continue
+                if not takeoff_left <= takeoff_x <= takeoff_right:
+                    continue
+                if abs(landing_x - takeoff_x) > reach:
+                    continue
+                self.add_edge(
+                    source,
+                    target,
+                    "jump",
+                    takeoff_x,
+                    landing_x,
+                    -self.jump_speed,
+                    airtime,
+                )
+
+    def segment_at(self, x, bottom):
+        row = round(bottom / TILE_SIZE)
+        if abs(row * TILE_SIZE - bottom) > 1:
+            return None
+        index = self.surface_index.get((row, int(x // TILE_SIZE)))
+        if index is None:
+            for offset in (-self.half_width, self.half_width):
+                index = self.surface_index.get((row, int((x + offset) // TILE_SIZE)))
+                if index is not None:
+                    break
+        return index
+
+    def start_search(self, target):
+        search = {
+            "cost": {target: 0.0},
+            "route": {},
+            "settled": set(),
+            "queue": [(0.0, target)],
+        }
+        self.searches[target] = search
+        self.pending.append(target)
+        while len(self.searches) > self.cache_size:
+            evicted, _ = self.searches.popitem(last=False)
+            if evicted in self.pending:
+                self.pending.remove(evicted)
+        return search
+
+    def advance(self, budget):
+        while budget > 0 and self.pending:
+            search = self.searches[self.pending[0]]
+            cost = search["cost"]
+            route = search["route"]
+            settled = search["settled"]
+            queue = search["queue"]
+            while queue and budget > 0:
+                current_cost, node = heapq.heappop(queue)
+                if node in settled:
+                    continue
+                settled.add(node)
+                budget -= 1
+                for source, edge in self.reverse_edges[node]:
+                    candidate = current_cost + edge["cost"]
+                    if candidate < cost.get(source, math.inf):
+                        cost[source] = candidate
+                        route[source] = edge
+                        heapq.heappush(queue, (candidate, source))
+            if not queue:
+                search["cost"] = None
+                self.pending.popleft()
+
+    def next_edge(self, source, target):
+        if source is None or target is None or source == target:
+            return None
+        search = self.searches.get(target)
+        if search is None:
+            search = self.start_search(target)
+        else:
+            self.searches.move_to_end(target)
+        if source not in search["settled"]:
+            return None
+        return search["route"].get(source)
+
+
 LEVEL_DATA = load_level(MAP_PATH)
 
 WIDTH = LEVEL_DATA["cols"] * TILE_SIZE
@@ -157,11 +460,56 @@ ENEMY_ATTACK_ACTIVE_END = 0.32
 ENEMY_ATTACK_RANGE = 60
 ENEMY_SIZE = (32, 44)
 ENEMY_ATTACK_SIZE = (52, 40)
+ENEMY_CHASE_RANGE = TILE_SIZE * 10
+NAV_SEARCH_BUDGET = 256
+
+MODE_CLASSIC = "CLASSIC"
+MODE_ENDLESS = "ENDLESS"
+WAVE_MAX_ALIVE = 16
+WAVE_BASE_SIZE = 4
+WAVE_GROWTH = 2
+WAVE_FIRST_DELAY = 1.5
+WAVE_INTERVAL = 25.0
+WAVE_BREAK = 3.0
+WAVE_SPAWN_GAP = 0.6
+WAVE_SAFE_DISTANCE = TILE_SIZE * 5
 
 MUSIC_TRACK = "music_theme"
 SFX_CLICK = "click"
 SFX_HIT = "hit"
 
+PARTICLE_CAPACITY = 4096
+PARTICLE_FADE_STEPS = 4
+PARTICLE_EFFECTS = {
+    "hit": {
+        "count": 18,
+        "arc": (0.0, 2 * math.pi),
+        "speed": (80, 260),
+        "life": (0.25, 0.5),
+        "gravity": 500,
+        "size": 4,
+        "color": (255, 226, 150),
+    },
+    "death": {
+        "count": 42,
+        "arc": (math.pi, 2 * math.pi),
+        "speed": (60, 320),
+        "life": (0.4, 0.9),
+        "gravity": 700,
+        "size": 5,
+        "color": (246, 150, 176),
+    },
+    "dust": {
+        "count": 10,
+        "arc": (math.pi * 1.05, math.pi * 1.95),
+        "speed": (30, 110),
+        "life": (0.2, 0.45),
+        "gravity": 120,
+        "size": 3,
+        "color": (190, 196, 214),
+    },
+}
+
 SOLID_RECTS = LEVEL_DATA["solids"]
 SOLID_TILE_COORDS = LEVEL_DATA["solid_tiles"]
 HERO_SPAWN = LEVEL_DATA["hero_spawn"]
@@ -189,7 +537,59 @@ GRAVITY = 900
 JUMP_SPEED = 420
 MAX_FALL_SPEED = 780
 
+NAV_GRAPH = NavGraph(
+    LEVEL_DATA["top_segments"],
+    ENEMY_SPEED,
+    JUMP_SPEED,
+    GRAVITY,
+    MAX_FALL_SPEED,
+    ENEMY_SIZE,
+    LEVEL_DATA["solid_tiles"],
+)
+LEVEL_DATA["nav"] = NAV_GRAPH
+
+SIM_STEP = 1 / 60
+MAX_FRAME_TIME = 0.25
+MAX_SIM_STEPS = 8
+
+QUALITY_LOW = 0
+QUALITY_MEDIUM = 1
+QUALITY_HIGH = 2
+FRAME_BUDGET = 0.012
+QUALITY_SMOOTHING = 0.1
+QUALITY_DOWNGRADE_FRAMES = 30
+QUALITY_UPGRADE_FRAMES = 240
+QUALITY_RECOVER_RATIO = 0.6
+
+TELEMETRY_DIR = os.environ.get("SKYBOUND_TELEMETRY")
+TELEMETRY_CAPACITY = 2048
+TELEMETRY_FLUSH_INTERVAL = 2.0
+
+CAPTURE_DIR = os.environ.get("SKYBOUND_CAPTURE")
+CAPTURE_FORMAT = os.environ.get("SKYBOUND_CAPTURE_FORMAT", "png")
+CAPTURE_POOL_SIZE = 6
+CAPTURE_FPS = 60
+CAPTURE_PNG_LEVEL = 3
+CAPTURE_BAND_ROWS = 32
+
+RENDER_SCALES = (1, 2, 4)
+RENDER_SCALE = os.environ.get("SKYBOUND_RENDER_SCALE", "1")
+HUD_NATIVE = os.environ.get("SKYBOUND_HUD_NATIVE", "1") != "0"
+TEXT_POSITIONS = {
+    "pos",
+    "topleft",
+    "topright",
+    "bottomleft",
+    "bottomright",
+    "midtop",
+    "midleft",
+    "midbottom",
+    "midright",
+    "center",
+}
+
 state = STATE_MENU
+game_mode = MODE_CLASSIC
 audio_enabled = True
 menu_buttons = []
 overlay_message = ""
@@ -197,34 +597,548 @@ overlay_button = Rect(
     (WIDTH // 2 - 160, HEIGHT // 2 + 60),
     (320, 70),
 )
+sim_accumulator = 0.0
 
 
 def clamp(value, minimum, maximum):
     return max(minimum, min(value, maximum))
 
 
+class QualityGovernor:
+    def __init__(self, budget, level=QUALITY_HIGH):
+        self.budget = budget
+        self.level = level
+        self.average = budget / 2
+        self.over_frames = 0
+        self.under_frames = 0
+        self.frame_start = None
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        self.record(time.perf_counter() - self.frame_start)
+        self.frame_start = None
+
+    def record(self, frame_time):
+        self.average += (frame_time - self.average) * QUALITY_SMOOTHING
+        if self.average > self.budget:
+            self.over_frames += 1
+            self.under_frames = 0
+            if (
+                self.over_frames >= QUALITY_DOWNGRADE_FRAMES
+                and self.level > QUALITY_LOW
+            ):
+                self.level -= 1
+                self.over_frames = 0
+        elif self.average < self.budget * QUALITY_RECOVER_RATIO:
+            self.under_frames += 1
+            self.over_frames = 0
+            if (
+                self.under_frames >= QUALITY_UPGRADE_FRAMES
+                and self.level < QUALITY_HIGH
+            ):
+                self.level += 1
+                self.under_frames = 0
+        else:
+            self.over_frames = 0
+            self.under_frames = 0
+
+
+quality = QualityGovernor(FRAME_BUDGET)
+
+
+class Telemetry:
+    def __init__(self, directory, capacity=TELEMETRY_CAPACITY):
+        self.enabled = bool(directory)
+        self.capacity = capacity
+        self.kinds = [""] * capacity
+        self.times = [0.0] * capacity
+        self.xs = [0.0] * capacity
+        self.ys = [0.0] * capacity
+        self.values = [0.0] * capacity
+        self.head = 0
+        self.count = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.written = 0
+        self.record_seconds = 0.0
+        self.started = time.perf_counter()
+        self.session_started = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.path = None
+        self.thread = None
+        if not self.enabled:
+            return
+        os.makedirs(directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        name = f"session-{stamp}-{os.getpid()}.jsonl.gz"
+        self.path = os.path.join(directory, name)
+        self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+        self.thread.start()
+
+    def record(self, kind, x=0.0, y=0.0, value=0.0):
+        if not self.enabled:
+            return
+        started = time.perf_counter()
+        with self.lock:
+            if self.count == self.capacity:
+                self.dropped += 1
+            else:
+                slot = (self.head + self.count) % self.capacity
+                self.kinds[slot] = kind
+                self.times[slot] = started - self.started
+                self.xs[slot] = x
+                self.ys[slot] = y
+                self.values[slot] = value
+                self.count += 1
+                self.recorded += 1
+            backlog = self.count
+        if backlog * 2 >= self.capacity:
+            self.wake.set()
+        self.record_seconds += time.perf_counter() - started
+
+    def begin_session(self):
+        self.session_started = time.perf_counter()
+        self.record("session_start", value=1.0 if game_mode == MODE_ENDLESS else 0.0)
+
+    def end_session(self, kind, value=None):
+        if self.session_started is None:
+            return
+        if value is None:
+            value = time.perf_counter() - self.session_started
+        self.record(kind, hero.actor.x, hero.actor.y, value)
+        self.session_started = None
+
+    def take(self, column, start, count):
+        end = start + count
+        if end <= self.capacity:
+            return column[start:end]
+        return column[start:] + column[: end - self.capacity]
+
+    def drain(self):
+        with self.lock:
+            start = self.head
+            count = self.count
+            kinds = self.take(self.kinds, start, count)
+            times = self.take(self.times, start, count)
+            xs = self.take(self.xs, start, count)
+            ys = self.take(self.ys, start, count)
+            values = self.take(self.values, start, count)
+            self.head = (start + count) % self.capacity
+            self.count = 0
+            dropped = self.dropped
+        batch = [
+            {
+                "event": kind,
+                "t": round(at, 4),
+                "x": round(x, 1),
+                "y": round(y, 1),
+                "value": value,
+            }
+            for kind, at, x, y, value in zip(kinds, times, xs, ys, values)
+        ]
+        return batch, dropped
+
+    def stats(self):
+        average = self.record_seconds / self.recorded if self.recorded else 0.0
+        return {
+            "event": "telemetry",
+            "recorded": self.recorded,
+            "dropped": self.dropped,
+            "written": self.written,
+            "record_us": round(average * 1_000_000, 3),
+        }
+
+    def run(self):
+        reported_drops = 0
+        with gzip.open(self.path, "at", encoding="utf-8") as target:
+            while True:
+                self.wake.wait(TELEMETRY_FLUSH_INTERVAL)
+                self.wake.clear()
+                stopping = self.stopping
+                batch, dropped = self.drain()
+                if dropped != reported_drops:
+                    batch.append(
+                        {"event": "dropped", "value": dropped - reported_drops}
+                    )
+                    reported_drops = dropped
+                if stopping:
+                    batch.append(self.stats())
+                for entry in batch:
+                    target.write(json.dumps(entry, separators=(",", ":")))
+                    target.write("\n")
+                self.written += len(batch)
+                target.flush()
+                if stopping:
+                    return
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.end_session("quit")
+        self.stopping = True
+        self.wake.set()
+        self.thread.join(timeout=2.0)
+        self.thread = None
+
+
+telemetry = Telemetry(TELEMETRY_DIR)
+atexit.register(telemetry.close)
+
+
+def png_chunk(tag, data):
+    checksum = zlib.crc32(tag + data)
+    return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", checksum)
+
+
+def channel_offsets(masks):
+    offsets = []
+    for mask in masks[:3]:
+        offset = (mask.bit_length() - 1) // 8
+        if sys.byteorder == "big":
+            offset = 3 - offset
+        offsets.append(offset)
+    return offsets
+
+
+def encode_png(buffer, width, height, pitch, offsets):
+    pixels = np.frombuffer(buffer, dtype=np.uint8).reshape(height, pitch // 4, 4)
+    rows = np.zeros((CAPTURE_BAND_ROWS, 1 + width * 3), dtype=np.uint8)
+    rgb = rows[:, 1:].reshape(CAPTURE_BAND_ROWS, width, 3)
+    compressor = zlib.compressobj(CAPTURE_PNG_LEVEL)
+    parts = []
+    for top in range(0, height, CAPTURE_BAND_ROWS):
+        band = pixels[top : top + CAPTURE_BAND_ROWS, :width]
+        count = len(band)
+        for channel, offset in enumerate(offsets):
+            rgb[:count, :, channel] = band[:, :, offset]
+        parts.append(compressor.compress(rows[:count]))
+    parts.append(compressor.flush())
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"".join(
+        (
+            b"\x89PNG\r\n\x1a\n",
+            png_chunk(b"IHDR", header),
+            png_chunk(b"IDAT", b"".join(parts)),
+            png_chunk(b"IEND", b""),
+        )
+    )
+
+
+class FrameRecorder:
+    def __init__(
+        self, directory, output_format=CAPTURE_FORMAT, pool_size=CAPTURE_POOL_SIZE
+    ):
+        self.directory = directory or "captures"
+        self.output_format = output_format
+        self.pool_size = pool_size
+        self.start_pending = bool(directory)
+        self.buffers = []
+        self.free = queue.SimpleQueue()
+        self.pending = queue.SimpleQueue()
+        self.thread = None
+        self.recording = False
+        self.target = None
+        self.size = None
+        self.started = 0.0
+        self.frame = 0
+        self.captured = 0
+        self.skipped = 0
+        self.written = 0
+
+    def start(self, surface):
+        if self.recording:
+            return
+        if self.output_format not in ("png", "raw"):
+            print(f"[capture] Unknown capture format: {self.output_format}")
+            return
+        if self.output_format == "png" and surface.get_bitsize() != 32:
+            print("[capture] PNG capture needs a 32-bit display; use raw instead")
+            return
+        target = self.make_target()
+        if target is None:
+            return
+        self.target = target
+        self.size = surface.get_size()
+        length = surface.get_pitch() * surface.get_height()
+        if len(self.buffers) != self.pool_size or len(self.buffers[0]) != length:
+            self.buffers = [bytearray(length) for _ in range(self.pool_size)]
+        self.free = queue.SimpleQueue()
+        self.pending = queue.SimpleQueue()
+        for buffer in self.buffers:
+            self.free.put(buffer)
+        self.started = time.perf_counter()
+        self.frame = 0
+        self.captured = 0
+        self.skipped = 0
+        self.written = 0
+        layout = {
+            "width": self.size[0],
+            "height": self.size[1],
+            "pitch": surface.get_pitch(),
+            "bits": surface.get_bitsize(),
+            "masks": list(surface.get_masks()),
+            "fps": CAPTURE_FPS,
+        }
+        self.thread = threading.Thread(
+            target=self.run, args=(layout,), name="capture", daemon=True
+        )
+        self.recording = True
+        self.thread.start()
+
+    def make_target(self):
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.directory, f"capture-{stamp}")
+        target = base
+        suffix = 1
+        while True:
+            try:
+                os.makedirs(target)
+            except FileExistsError:
+                suffix += 1
+                target = f"{base}-{suffix}"
+            except OSError as exc:
+                print(f"[capture] Cannot create capture folder {target}: {exc}")
+                return None
+            else:
+                return target
+
+    def capture(self, surface):
+        if self.start_pending:
+            self.start_pending = False
+            self.start(surface)
+        if not self.recording:
+            return
+        self.frame += 1
+        if surface.get_size() != self.size:
+            self.skipped += 1
+            return
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            self.skipped += 1
+            return
+        memoryview(buffer)[:] = surface.get_buffer()
+        self.pending.put((self.frame, time.perf_counter() - self.started, buffer))
+        self.captured += 1
+
+    def run(self, layout):
+        width, height = self.size
+        offsets = channel_offsets(layout["masks"])
+        source_frames = []
+        times = []
+        raw_path = os.path.join(self.target, "frames.raw")
+        try:
+            with (
+                open(raw_path, "wb")
+                if self.output_format == "raw"
+                else contextlib.nullcontext()
+            ) as raw:
+                while True:
+                    item = self.pending.get()
+                    if item is None:
+                        break
+                    number, at, buffer = item
+                    try:
+                        if raw is not None:
+                            raw.write(buffer)
+                        else:
+                            data = encode_png(
+                                buffer, width, height, layout["pitch"], offsets
+                            )
+                            name = f"frame_{self.written + 1:06d}.png"
+                            path = os.path.join(self.target, name)
+                            with open(path, "wb") as image:
+                                image.write(data)
+                        self.written += 1
+                        source_frames.append(number)
+                        times.append(round(at, 4))
+                    except (OSError, ValueError, zlib.error) as exc:
+                        print(f"[capture] Failed to write frame {number}: {exc}")
+                    finally:
+                        self.free.put(buffer)
+        finally:
+            layout.update(
+                frames=self.written,
+                skipped=self.skipped,
+                source_frames=source_frames,
+                times=times,
+            )
+            meta_path = os.path.join(self.target, "capture.json")
+            with open(meta_path, "w", encoding="utf-8") as meta:
+                json.dump(layout, meta)
+
+    def stop(self):
+        if not self.recording:
+            return
+        self.recording = False
+        self.pending.put(None)
+        self.thread.join()
+        self.thread = None
+        print(
+            f"[capture] Wrote {self.written} frames to {self.target} "
+            f"({self.skipped} skipped)"
+        )
+
+    def toggle(self, surface):
+        if self.recording:
+            self.stop()
+        else:
+            self.start(surface)
+
+
+recorder = FrameRecorder(CAPTURE_DIR)
+atexit.register(recorder.stop)
+
+
+def render_scale(value):
+    try:
+        scale = int(value)
+    except ValueError:
+        scale = None
+    if scale not in RENDER_SCALES:
+        print(f"[render] Unsupported render scale {value!r}; using 1")
+        return 1
+    return scale
+
+
+class Canvas:
+    def __init__(self, scale=1, hud_native=True):
+        self.scale = scale
+        self.hud_native = hud_native
+        self.hud_in_scene = scale == 1 or not hud_native
+        self.screen_surface = None
+        self.internal = None
+        self.surface = None
+        self.current_scale = 1
+        self.image_cache = {}
+        self.list_cache = {}
+
+    def begin(self, screen_surface):
+        self.screen_surface = screen_surface
+        if self.scale == 1:
+            self.use(screen_surface, 1)
+            return
+        width, height = screen_surface.get_size()
+        size = (-(-width // self.scale), -(-height // self.scale))
+        if self.internal is None or self.internal.get_size() != size:
+            self.internal = pygame.Surface(size, 0, screen_surface)
+            self.image_cache.clear()
+            self.list_cache.clear()
+        self.use(self.internal, self.scale)
+
+    def use(self, surface, scale):
+        self.surface = surface
+        self.current_scale = scale
+
+    def present(self):
+        if self.surface is self.internal and self.internal is not None:
+            size = self.screen_surface.get_size()
+            pygame.transform.scale(self.internal, size, self.screen_surface)
+        self.use(self.screen_surface, 1)
+
+    def to_rect(self, rect):
+        scale = self.current_scale
+        if scale == 1:
+            return rect
+        left = rect.left // scale
+        top = rect.top // scale
+        right = -(-rect.right // scale)
+        bottom = -(-rect.bottom // scale)
+        return Rect((left, top, right - left, bottom - top))
+
+    def to_point(self, pos):
+        scale = self.current_scale
+        return round(pos[0] / scale), round(pos[1] / scale)
+
+    def image(self, image):
+        if self.current_scale == 1:
+            return image
+        cached = self.image_cache.get(id(image))
+        if cached is None or cached[0] is not image:
+            width, height = image.get_size()
+            size = (
+                max(1, width // self.current_scale),
+                max(1, height // self.current_scale),
+            )
+            cached = (image, pygame.transform.scale(image, size))
+            self.image_cache[id(image)] = cached
+        return cached[1]
+
+    def images(self, images):
+        if self.current_scale == 1:
+            return images
+        cached = self.list_cache.get(id(images))
+        if cached is None or cached[0] is not images:
+            cached = (images, [self.image(image) for image in images])
+            self.list_cache[id(images)] = cached
+        return cached[1]
+
+    def fill(self, color):
+        self.surface.fill(color)
+
+    def filled_rect(self, rect, color):
+        pygame.draw.rect(self.surface, color, self.to_rect(rect), 0)
+
+    def rect(self, rect, color):
+        pygame.draw.rect(self.surface, color, self.to_rect(rect), 1)
+
+    def filled_circle(self, pos, radius, color):
+        radius = max(1, round(radius / self.current_scale))
+        pygame.draw.circle(self.surface, color, self.to_point(pos), radius, 0)
+
+    def blits(self, entries):
+        scale = self.current_scale
+        if scale != 1:
+            entries = [
+                (self.image(image), (x / scale, y / scale)) for image, (x, y) in entries
+            ]
+        self.surface.blits(entries, doreturn=False)
+
+    def text(self, text, **kwargs):
+        scale = self.current_scale
+        if scale != 1:
+            for key in TEXT_POSITIONS.intersection(kwargs):
+                kwargs[key] = self.to_point(kwargs[key])
+            if "fontsize" in kwargs:
+                kwargs["fontsize"] = max(1, round(kwargs["fontsize"] / scale))
+        ptext.draw(text, surf=self.surface, **kwargs)
+
+
+canvas = Canvas(render_scale(RENDER_SCALE), HUD_NATIVE)
+
+
 def draw_text(text, **kwargs):
     kwargs.setdefault("color", TEXT_COLOR)
-    kwargs.setdefault("owidth", 1)
+    kwargs.setdefault("owidth", 1 if quality.level > QUALITY_LOW else None)
     kwargs.setdefault("ocolor", "black")
-    screen.draw.text(text, **kwargs)
+    canvas.text(text, **kwargs)
 
 
 def draw_background_layers():
-    screen.fill(BG_COLOR)
+    canvas.fill(BG_COLOR)
     for start_y, color in BACKGROUND_BANDS:
         height = HEIGHT - start_y
-        screen.draw.filled_rect(Rect((0, start_y, WIDTH, height)), color)
-    for x, y, radius in BACKGROUND_STARS:
-        screen.draw.filled_circle((x, y), radius, (200, 210, 255))
+        canvas.filled_rect(Rect((0, start_y, WIDTH, height)), color)
+    detailed = quality.level >= QUALITY_HIGH
+    if detailed:
+        for x, y, radius in BACKGROUND_STARS:
+            canvas.filled_circle((x, y), radius, (200, 210, 255))
     for column, color in BACKGROUND_COLUMNS:
-        screen.draw.filled_rect(column, color)
+        canvas.filled_rect(column, color)
+        if not detailed:
+            continue
         outline = (
             min(color[0] + 20, 255),
             min(color[1] + 20, 255),
             min(color[2] + 20, 255),
         )
-        screen.draw.rect(column, outline)
+        canvas.rect(column, outline)
 
 
 def draw_tiles():
@@ -235,10 +1149,10 @@ def draw_tiles():
         left = tile_x * TILE_SIZE
         top = tile_y * TILE_SIZE
         tile_rect = Rect((left, top, TILE_SIZE, TILE_SIZE))
-        screen.draw.filled_rect(tile_rect, base_color)
-        screen.draw.rect(tile_rect, edge_color)
+        canvas.filled_rect(tile_rect, base_color)
+        canvas.rect(tile_rect, edge_color)
         top_rect = Rect((left, top, TILE_SIZE, 6))
-        screen.draw.filled_rect(top_rect, top_color)
+        canvas.filled_rect(top_rect, top_color)
 
 
 def play_sound(name, force=False):
@@ -310,6 +1224,22 @@ class Character:
         self.actor = Actor(frames["idle"][0], pos, anchor=("center", "bottom"))
         self.animator = SpriteAnimator(self.actor, frames, loop_states)
         self.speed = speed
+        self.previous_pos = pos
+
+    def snapshot(self):
+        self.previous_pos = (self.actor.x, self.actor.y)
+
+    def submit(self, batch, alpha=1.0, layer=0):
+        actor = self.actor
+        image = images.load(actor.image)
+        previous_x, previous_y = self.previous_pos
+        left, top = actor.topleft
+        left += (previous_x - actor.x) * (1.0 - alpha)
+        top += (previous_y - actor.y) * (1.0 - alpha)
+        width, height = image.get_size()
+        if left >= WIDTH or top >= HEIGHT or left + width <= 0 or top + height <= 0:
+            return
+        batch.add(image, (left, top), layer)
 
 
 class Hero(Character):
@@ -336,6 +1266,7 @@ class Hero(Character):
         self.max_jumps = 2
         self.jumps_used = 0
         self.animator.set_state("idle")
+        self.snapshot()
 
     def request_jump(self):
         self.jump_request = True
@@ -349,10 +1280,14 @@ class Hero(Character):
 
         vx = horizontal * self.speed
         vy = self.velocity[1]
+        was_on_ground = self.on_ground
         if self.jump_request and self.jumps_used < self.max_jumps:
+            if was_on_ground:
+                particles.emit("dust", (self.actor.x, self.actor.y))
             vy = -JUMP_SPEED
             self.on_ground = False
             self.jumps_used += 1
+            telemetry.record("jump", self.actor.x, self.actor.y, self.jumps_used)
         self.jump_request = False
 
         vy = min(vy + GRAVITY * dt, MAX_FALL_SPEED)
@@ -420,6 +1355,8 @@ class Hero(Character):
         if self.on_ground:
             self.safe_pos = (self.actor.x, self.actor.y)
             self.jumps_used = 0
+            if not was_on_ground:
+                particles.emit("dust", (self.actor.x, self.actor.y))
 
         self.velocity[0] = vx
         self.velocity[1] = vy
@@ -478,12 +1415,15 @@ class Hero(Character):
         self.velocity = [0.0, 0.0]
         self.on_ground = False
         self.jump_request = False
+        particles.emit("hit", self.hitbox().center)
 
         self.health = max(0, self.health - PLAYER_HIT_DAMAGE)
+        telemetry.record("hero_hit", self.actor.x, self.actor.y, self.health)
         lost_life = False
         if self.health == 0:
             lost_life = True
             self.lives = max(0, self.lives - 1)
+            telemetry.record("death", self.actor.x, self.actor.y, self.lives)
             self.health = MAX_HEALTH
             self.actor.x, self.actor.y = self.spawn
             self.safe_pos = self.spawn
@@ -502,6 +1442,7 @@ class Hero(Character):
                     hero_box = self.hitbox()
                     break
             self.actor.y = original_y
+        self.snapshot()
 
         play_sound(SFX_HIT)
         return True, lost_life
@@ -515,35 +1456,35 @@ class Hero(Character):
 
 class Enemy(Character):
     def __init__(self, territory, spawn_pos=None):
-        if spawn_pos is None:
-            spawn_pos = (territory.centerx, territory.bottom)
-        half_width = ENEMY_SIZE[0] / 2
-        left_bound = territory.left + half_width
-        right_bound = territory.right - half_width
-        if left_bound > right_bound:
-            center_x = territory.centerx
-            left_bound = right_bound = center_x
-        spawn_x = clamp(spawn_pos[0], left_bound, right_bound)
-        spawn_pos = (spawn_x, spawn_pos[1])
         super().__init__(
-            spawn_pos, ENEMY_FRAMES, ENEMY_SPEED, loop_states={"idle", "move"}
+            (territory.centerx, territory.bottom),
+            ENEMY_FRAMES,
+            ENEMY_SPEED,
+            loop_states={"idle", "move"},
         )
-        self.territory = territory
-        self.spawn_pos = spawn_pos
-        self.surface_y = spawn_pos[1]
-        self.half_width = half_width
+        self.half_width = ENEMY_SIZE[0] / 2
         self.half_height = ENEMY_SIZE[1] / 2
         self.attack_offset = self.half_width + ENEMY_ATTACK_SIZE[0] / 2
         self.attack_half_height = ENEMY_ATTACK_SIZE[1] / 2
-        self.left_bound = left_bound
-        self.right_bound = right_bound
-        self.direction = random.choice([-1, 1])
-        self.attack_timer = 0.0
-        self.cooldown = 0.0
-        self.alive = True
-        self.actor.bottom = self.surface_y
+        self.pool_index = -1
+        self.assign_spawn(territory, spawn_pos)
+        self.reset()
+
+    def assign_spawn(self, territory, spawn_pos=None):
+        if spawn_pos is None:
+            spawn_pos = (territory.centerx, territory.bottom)
+        self.set_territory(territory, spawn_pos[1])
+        spawn_x = clamp(spawn_pos[0], self.left_bound, self.right_bound)
+        self.home_territory = territory
+        self.spawn_pos = (spawn_x, spawn_pos[1])
+        self.home_segment = NAV_GRAPH.segment_at(*self.spawn_pos)
 
     def reset(self):
+        self.set_territory(self.home_territory, self.spawn_pos[1])
+        self.segment = self.home_segment
+        self.airborne = False
+        self.moving = False
+        self.velocity = [0.0, 0.0]
         self.actor.x, self.actor.y = self.spawn_pos
         self.actor.bottom = self.surface_y
         self.direction = random.choice([-1, 1])
@@ -551,12 +1492,26 @@ class Enemy(Character):
         self.cooldown = 0.0
         self.alive = True
         self.animator.set_state("idle")
+        self.snapshot()
+
+    def set_territory(self, territory, surface_y):
+        left_bound = territory.left + self.half_width
+        right_bound = territory.right - self.half_width
+        if left_bound > right_bound:
+            left_bound = right_bound = territory.centerx
+        self.territory = territory
+        self.surface_y = surface_y
+        self.left_bound = left_bound
+        self.right_bound = right_bound
 
     def take_hit(self):
         if not self.alive:
             return
+        particles.emit("death", self.hitbox().center)
+        telemetry.record("kill", self.actor.x, self.actor.y)
         self.alive = False
         self.actor.pos = (-120, -120)
+        self.snapshot()
 
     def is_attack_active(self):
         if self.attack_timer <= 0.0:
@@ -579,24 +1534,120 @@ class Enemy(Character):
         top = self.actor.y - height
         return Rect((int(left), int(top), width, height))
 
+    def chase_target(self, hero):
+        if hero is None or self.segment is None:
+            return None
+        if (
+            abs(hero.actor.x - self.actor.x) > ENEMY_CHASE_RANGE
+            or abs(hero.actor.y - self.actor.y) > ENEMY_CHASE_RANGE
+        ):
+            return None
+        return NAV_GRAPH.segment_at(*hero.safe_pos)
+
+    def walk_towards(self, goal_x, dt):
+        offset = goal_x - self.actor.x
+        step = self.speed * dt
+        if offset:
+            self.direction = 1 if offset > 0 else -1
+        if abs(offset) <= step:
+            self.actor.x = goal_x
+            self.moving = False
+            return True
+        self.actor.x += self.direction * step
+        self.moving = True
+        return False
+
+    def update_movement(self, dt, hero):
+        target = self.chase_target(hero)
+        if target is not None and target == self.segment:
+            goal_x = clamp(hero.actor.x, self.left_bound, self.right_bound)
+            self.walk_towards(goal_x, dt)
+            return
+        edge = NAV_GRAPH.next_edge(self.segment, target)
+        if edge is not None:
+            if self.walk_towards(edge["takeoff_x"], dt):
+                self.launch(edge)
+            return
+        self.actor.x += self.direction * self.speed * dt
+        if self.actor.x <= self.left_bound:
+            self.actor.x = self.left_bound
+            self.direction = 1
+        elif self.actor.x >= self.right_bound:
+            self.actor.x = self.right_bound
+            self.direction = -1
+        self.moving = self.left_bound != self.right_bound
+
+    def launch(self, edge):
+        self.airborne = True
+        self.moving = True
+        self.segment = None
+        self.velocity = [edge["vx"], edge["vy"]]
+        if edge["vx"]:
+            self.direction = 1 if edge["vx"] > 0 else -1
+
+    def land(self, x, surface_y):
+        index = NAV_GRAPH.segment_at(x, surface_y)
+        if index is not None:
+            territory = NAV_GRAPH.segments[index]["rect"]
+        else:
+            left = x - self.half_width
+            territory = Rect((int(left), int(surface_y), ENEMY_SIZE[0], TILE_SIZE))
+        self.airborne = False
+        self.velocity = [0.0, 0.0]
+        self.segment = index
+        self.set_territory(territory, surface_y)
+        self.actor.x = clamp(x, self.left_bound, self.right_bound)
+        self.actor.bottom = self.surface_y
+
+    def update_airborne(self, dt):
+        vx, vy = self.velocity
+        vy = min(vy + GRAVITY * dt, MAX_FALL_SPEED)
+        height = ENEMY_SIZE[1]
+        bottom = self.actor.bottom
+        x = self.actor.x + vx * dt
+        if vx and NAV_GRAPH.box_blocked(
+            x - self.half_width, bottom - height, x + self.half_width, bottom
+        ):
+            x = self.actor.x
+            vx = 0.0
+        left = x - self.half_width
+        right = x + self.half_width
+        new_bottom = bottom + vy * dt
+        if vy < 0:
+            top = bottom - height
+            new_top = new_bottom - height
+            if NAV_GRAPH.box_blocked(left, new_top, right, top):
+                new_top = min((int(new_top // TILE_SIZE) + 1) * TILE_SIZE, top)
+                new_bottom = new_top + height
+                vy = 0.0
+        elif vy > 0:
+            first_row = int(bottom // TILE_SIZE) + 1
+            for row in range(first_row, int(new_bottom // TILE_SIZE) + 1):
+                surface_y = row * TILE_SIZE
+                if NAV_GRAPH.box_blocked(left, surface_y, right, surface_y + 1):
+                    self.land(x, surface_y)
+                    return
+        self.velocity = [vx, vy]
+        self.actor.x = x
+        self.actor.bottom = new_bottom
+        if self.actor.top > HEIGHT + 80:
+            self.reset()
+
     def update(self, dt, hero):
         if not self.alive:
             return
 
         self.cooldown = max(0.0, self.cooldown - dt)
-        if self.attack_timer > 0.0:
+        if self.airborne:
+            self.update_airborne(dt)
+        elif self.attack_timer > 0.0:
             self.attack_timer = max(0.0, self.attack_timer - dt)
         else:
-            self.actor.x += self.direction * self.speed * dt
-            if self.actor.x <= self.left_bound:
-                self.actor.x = self.left_bound
-                self.direction = 1
-            elif self.actor.x >= self.right_bound:
-                self.actor.x = self.right_bound
-                self.direction = -1
+            self.update_movement(dt, hero)
 
         if (
             hero
+            and not self.airborne
             and self.attack_timer == 0.0
             and self.cooldown == 0.0
             and abs(hero.actor.x - self.actor.x) <= ENEMY_ATTACK_RANGE
@@ -611,16 +1662,229 @@ class Enemy(Character):
             if self.animator.state == "attack":
                 self.animator.set_state("idle")
             else:
-                moving = self.left_bound != self.right_bound
-                self.animator.set_state("move" if moving else "idle")
+                self.animator.set_state("move" if self.moving else "idle")
 
         self.animator.update(dt)
         self.actor.flip_x = self.direction < 0
-        self.actor.bottom = self.surface_y
+        if not self.airborne:
+            self.actor.bottom = self.surface_y
+
+
+class SpriteBatch:
+    def __init__(self):
+        self.entries = []
+
+    def add(self, image, pos, layer=0):
+        self.entries.append((layer, image, pos))
+
+    def flush(self, target):
+        if not self.entries:
+            return
+        self.entries.sort(key=lambda entry: entry[0])
+        target.blits([(image, pos) for _, image, pos in self.entries])
+        self.entries.clear()
+
+
+class ParticleSystem:
+    def __init__(self, capacity, effects, fade_steps=PARTICLE_FADE_STEPS):
+        self.capacity = capacity
+        self.effects = effects
+        self.effect_ids = {name: index for index, name in enumerate(effects)}
+        self.fade_steps = fade_steps
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 2), dtype=np.float32)
+        self.gravity = np.zeros(capacity, dtype=np.float32)
+        self.life = np.zeros(capacity, dtype=np.float32)
+        self.max_life = np.ones(capacity, dtype=np.float32)
+        self.kinds = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.expired = np.zeros(capacity, dtype=bool)
+        self.step = np.zeros((capacity, 2), dtype=np.float32)
+        self.free = np.arange(capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = capacity
+        self.rng = np.random.default_rng()
+        self.half_sizes = np.array(
+            [effect["size"] / 2 for effect in effects.values()], dtype=np.float32
+        )
+        self.sprites = []
+        for effect in effects.values():
+            size = effect["size"]
+            for step in range(fade_steps):
+                alpha = 255 * (fade_steps - step) // fade_steps
+                sprite = pygame.Surface((size, size), pygame.SRCALPHA)
+                sprite.fill((*effect["color"], alpha))
+                self.sprites.append(sprite)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free[:] = np.arange(self.capacity - 1, -1, -1, dtype=np.int32)
+        self.free_count = self.capacity
+
+    def emit(self, name, pos, count=None):
+        effect = self.effects[name]
+        if count is None:
+            count = effect["count"]
+        count = min(count, self.free_count)
+        if count <= 0:
+            return 0
+        start = self.free_count - count
+        slots = self.free[start : self.free_count]
+        self.free_count = start
+        angles = self.rng.uniform(*effect["arc"], count)
+        speeds = self.rng.uniform(*effect["speed"], count)
+        lifetimes = self.rng.uniform(*effect["life"], count)
+        self.positions[slots] = pos
+        self.velocities[slots, 0] = np.cos(angles) * speeds
+        self.velocities[slots, 1] = np.sin(angles) * speeds
+        self.gravity[slots] = effect["gravity"]
+        self.life[slots] = lifetimes
+        self.max_life[slots] = lifetimes
+        self.kinds[slots] = self.effect_ids[name]
+        self.alive[slots] = True
+        return count
+
+    def update(self, dt):
+        if self.free_count == self.capacity:
+            return
+        np.subtract(self.life, dt, out=self.life)
+        self.velocities[:, 1] += self.gravity * dt
+        np.multiply(self.velocities, dt, out=self.step)
+        self.positions += self.step
+        np.less_equal(self.life, 0.0, out=self.expired)
+        np.logical_and(self.expired, self.alive, out=self.expired)
+        dead = np.flatnonzero(self.expired)
+        if dead.size:
+            self.alive[dead] = False
+            end = self.free_count + dead.size
+            self.free[self.free_count : end] = dead
+            self.free_count = end
+
+    def draw(self, target):
+        if self.free_count == self.capacity:
+            return
+        active = np.flatnonzero(self.alive)
+        kinds = self.kinds[active]
+        fade = (1.0 - self.life[active] / self.max_life[active]) * self.fade_steps
+        fade = np.clip(fade.astype(np.int32), 0, self.fade_steps - 1)
+        sprite_ids = kinds * self.fade_steps + fade
+        half_sizes = self.half_sizes[kinds]
+        scale = target.current_scale
+        xs = (self.positions[active, 0] - half_sizes) / scale
+        ys = (self.positions[active, 1] - half_sizes) / scale
+        sprites = target.images(self.sprites)
+        target.surface.blits(
+            [
+                (sprites[index], (x, y))
+                for index, x, y in zip(sprite_ids.tolist(), xs.tolist(), ys.tolist())
+            ],
+            doreturn=False,
+        )
 
 
+class EnemyPool:
+    def __init__(self, spawn_infos, capacity):
+        self.enemies = []
+        if spawn_infos:
+            for index in range(capacity):
+                info = spawn_infos[index % len(spawn_infos)]
+                self.enemies.append(Enemy(info["territory"], info["spawn"]))
+        self.live = []
+        self.free = []
+        for enemy in reversed(self.enemies):
+            self.park(enemy)
+
+    def park(self, enemy):
+        enemy.alive = False
+        enemy.pool_index = -1
+        enemy.actor.pos = (-120, -120)
+        enemy.snapshot()
+        self.free.append(enemy)
+
+    def spawn(self, info):
+        if not self.free:
+            return None
+        enemy = self.free.pop()
+        enemy.assign_spawn(info["territory"], info["spawn"])
+        enemy.reset()
+        enemy.pool_index = len(self.live)
+        self.live.append(enemy)
+        return enemy
+
+    def release(self, enemy):
+        index = enemy.pool_index
+        if index < 0:
+            return
+        last = self.live.pop()
+        if last is not enemy:
+            self.live[index] = last
+            last.pool_index = index
+        self.park(enemy)
+
+    def release_all(self):
+        while self.live:
+            self.release(self.live[-1])
+
+
+class WaveSpawner:
+    def __init__(self, pool, spawn_infos):
+        self.pool = pool
+        self.spawn_infos = spawn_infos
+        self.reset()
+
+    def reset(self):
+        self.wave = 0
+        self.pending = 0
+        self.timer = WAVE_FIRST_DELAY
+        self.spawn_timer = 0.0
+        self.next_info = 0
+
+    def pick_spawn(self, hero):
+        count = len(self.spawn_infos)
+        for offset in range(count):
+            index = (self.next_info + offset) % count
+            x, y = self.spawn_infos[index]["spawn"]
+            if (
+                abs(hero.actor.x - x) > WAVE_SAFE_DISTANCE
+                or abs(hero.actor.y - y) > WAVE_SAFE_DISTANCE
+            ):
+                break
+        else:
+            index = self.next_info % count
+        self.next_info = index + 1
+        return self.spawn_infos[index]
+
+    def update(self, dt, hero):
+        if not self.spawn_infos:
+            return
+        if self.pending == 0:
+            self.timer -= dt
+            if not self.pool.live:
+                self.timer = min(self.timer, WAVE_BREAK)
+            if self.timer > 0.0:
+                return
+            self.wave += 1
+            self.pending = WAVE_BASE_SIZE + (self.wave - 1) * WAVE_GROWTH
+            self.timer = WAVE_INTERVAL
+            self.spawn_timer = 0.0
+        if self.spawn_timer > 0.0:
+            self.spawn_timer -= dt
+            return
+        if len(self.pool.live) >= WAVE_MAX_ALIVE:
+            return
+        info = self.pick_spawn(hero)
+        enemy = self.pool.spawn(info)
+        if enemy is None:
+            return
+        particles.emit("dust", enemy.spawn_pos)
+        self.pending -= 1
+        self.spawn_timer = WAVE_SPAWN_GAP
+
+
+particles = ParticleSystem(PARTICLE_CAPACITY, PARTICLE_EFFECTS)
+sprite_batch = SpriteBatch()
 hero = Hero(HERO_SPAWN)
-enemies = [Enemy(info["territory"], info["spawn"]) for info in ENEMY_SPAWN_INFO]
+enemy_pool = EnemyPool(ENEMY_SPAWN_INFO, max(len(ENEMY_SPAWN_INFO), WAVE_MAX_ALIVE))
+spawner = WaveSpawner(enemy_pool, ENEMY_SPAWN_INFO)
 
 
 def get_solid_rects():
@@ -629,8 +1893,12 @@ def get_solid_rects():
 
 def reset_world(full=True):
     hero.reset(reset_lives=full)
-    for enemy in enemies:
-        enemy.reset()
+    enemy_pool.release_all()
+    spawner.reset()
+    if game_mode == MODE_CLASSIC:
+        for info in ENEMY_SPAWN_INFO:
+            enemy_pool.spawn(info)
+    particles.clear()
     global overlay_message
     overlay_message = ""
 
@@ -638,12 +1906,16 @@ def reset_world(full=True):
 def enter_victory():
     global state, overlay_message
     overlay_message = "All pigs defeated!"
+    telemetry.end_session("victory")
     state = STATE_VICTORY
 
 
 def enter_game_over():
     global state, overlay_message
     overlay_message = "Game Over!"
+    if game_mode == MODE_ENDLESS:
+        overlay_message = f"Game Over! Reached wave {spawner.wave}"
+    telemetry.end_session("game_over")
     state = STATE_GAME_OVER
 
 
@@ -651,7 +1923,7 @@ def create_menu_buttons():
     button_width = 320
     button_height = 64
     start_y = HEIGHT // 2 - 120
-    actions = ["start", "sound", "exit"]
+    actions = ["start", "mode", "sound", "exit"]
     buttons = []
     for index, action in enumerate(actions):
         rect = Rect(
@@ -670,6 +1942,9 @@ def refresh_menu_labels():
         action = entry["action"]
         if action == "start":
             entry["label"] = "Start Game"
+        elif action == "mode":
+            mode_name = "Endless Waves" if game_mode == MODE_ENDLESS else "Classic"
+            entry["label"] = f"Mode: {mode_name}"
         elif action == "sound":
             entry["label"] = f"Sound & Music: {'ON' if audio_enabled else 'OFF'}"
         else:
@@ -681,6 +1956,7 @@ def start_game():
     reset_world(full=True)
     state = STATE_PLAY
     stop_music()
+    telemetry.begin_session()
 
 
 def toggle_audio():
@@ -694,8 +1970,15 @@ def toggle_audio():
     refresh_menu_labels()
 
 
+def toggle_mode():
+    global game_mode
+    game_mode = MODE_ENDLESS if game_mode == MODE_CLASSIC else MODE_CLASSIC
+    refresh_menu_labels()
+
+
 def return_to_menu():
     global state
+    telemetry.end_session("quit")
     state = STATE_MENU
     reset_world(full=True)
     if audio_enabled:
@@ -703,8 +1986,6 @@ def return_to_menu():
 
 
 def draw_menu():
-    draw_background_layers()
-    draw_tiles()
     draw_text("Skybound Ruins", midtop=(WIDTH // 2, HEIGHT // 5), fontsize=64)
     draw_text(
         "Arrow/WASD move • Up/W jump • Space/Z/X attack • Esc returns",
@@ -714,14 +1995,21 @@ def draw_menu():
     )
     for entry in menu_buttons:
         rect = entry["rect"]
-        screen.draw.filled_rect(rect, (58, 78, 128))
-        screen.draw.rect(rect, (200, 220, 255))
+        canvas.filled_rect(rect, (58, 78, 128))
+        canvas.rect(rect, (200, 220, 255))
         draw_text(entry["label"], center=rect.center, fontsize=30)
 
 
 def draw_play():
-    draw_background_layers()
-    draw_tiles()
+    alpha = sim_accumulator / SIM_STEP
+    hero.submit(sprite_batch, alpha)
+    for enemy in enemy_pool.live:
+        enemy.submit(sprite_batch, alpha, layer=1)
+    sprite_batch.flush(canvas)
+    particles.draw(canvas)
+
+
+def draw_hud():
     draw_text(f"Lives: {hero.lives}", topleft=(20, 20), fontsize=30)
     draw_text(f"HP: {hero.health}/{MAX_HEALTH}", topleft=(20, 56), fontsize=26)
     draw_text(
@@ -729,44 +2017,64 @@ def draw_play():
         topright=(WIDTH - 20, 20),
         fontsize=24,
     )
-    hero.actor.draw()
-    for enemy in enemies:
-        if enemy.alive:
-            enemy.actor.draw()
+    if game_mode == MODE_ENDLESS:
+        draw_text(f"Wave: {spawner.wave}", topright=(WIDTH - 20, 50), fontsize=24)
 
 
 def draw_overlay(message):
-    screen.draw.filled_rect(Rect((0, 0, WIDTH, HEIGHT)), (0, 0, 0))
     draw_text(message, center=(WIDTH // 2, HEIGHT // 2 - 40), fontsize=56)
-    screen.draw.filled_rect(overlay_button, (60, 80, 130))
-    screen.draw.rect(overlay_button, (200, 220, 255))
+    canvas.filled_rect(overlay_button, (60, 80, 130))
+    canvas.rect(overlay_button, (200, 220, 255))
     draw_text("Restart", center=overlay_button.center, fontsize=34)
 
 
 def draw_exit():
-    screen.fill((0, 0, 0))
     draw_text("Thanks for playing!", center=(WIDTH // 2, HEIGHT // 2), fontsize=48)
 
 
-def draw():
+def draw_scene():
+    if state in {STATE_MENU, STATE_PLAY}:
+        draw_background_layers()
+        draw_tiles()
+        if state == STATE_PLAY:
+            if canvas.hud_in_scene:
+                draw_hud()
+            draw_play()
+    else:
+        canvas.fill((0, 0, 0))
+
+
+def draw_interface():
     if state == STATE_MENU:
         draw_menu()
     elif state == STATE_PLAY:
-        draw_play()
+        if not canvas.hud_in_scene:
+            draw_hud()
     elif state == STATE_VICTORY:
-        draw_play()
         draw_overlay(overlay_message or "Victory! All pigs defeated!")
     elif state == STATE_GAME_OVER:
-        draw_play()
         draw_overlay(overlay_message or "Game Over")
     else:
         draw_exit()
 
 
+def draw():
+    canvas.begin(screen.surface)
+    draw_scene()
+    if canvas.hud_native:
+        canvas.present()
+        draw_interface()
+    else:
+        draw_interface()
+        canvas.present()
+    recorder.capture(screen.surface)
+    quality.end_frame()
+
+
 def check_victory():
-    if state != STATE_PLAY:
+    if state != STATE_PLAY or game_mode == MODE_ENDLESS:
         return
-    if all(not enemy.alive for enemy in enemies):
+    if not enemy_pool.live:
         enter_victory()
 
 
@@ -776,9 +2084,10 @@ def hero_attack_check():
     zone = hero.attack_zone()
     if zone is None:
         return
-    for enemy in enemies:
-        if enemy.alive and enemy.hitbox().colliderect(zone):
+    for enemy in enemy_pool.live:
+        if enemy.hitbox().colliderect(zone):
             enemy.take_hit()
+            enemy_pool.release(enemy)
             hero.attack_used = True
             play_sound(SFX_HIT)
             check_victory()
@@ -787,9 +2096,7 @@ def hero_attack_check():
 
 def hero_damage_check():
     hero_box = hero.hitbox()
-    for enemy in enemies:
-        if not enemy.alive:
-            continue
+    for enemy in enemy_pool.live:
         hitbox = enemy.attack_hitbox()
         if hitbox and hitbox.colliderect(hero_box):
             took, lost_life = hero.take_hit()
@@ -799,13 +2106,35 @@ def hero_damage_check():
 
 
 def update(dt):
+    global sim_accumulator
+    quality.begin_frame()
     if state != STATE_PLAY:
+        sim_accumulator = 0.0
         return
+    sim_accumulator += min(dt, MAX_FRAME_TIME)
+    steps = 0
+    while sim_accumulator >= SIM_STEP and state == STATE_PLAY:
+        if steps == MAX_SIM_STEPS:
+            sim_accumulator = 0.0
+            break
+        step_simulation(SIM_STEP)
+        sim_accumulator -= SIM_STEP
+        steps += 1
+
+
+def step_simulation(dt):
+    hero.snapshot()
+    for enemy in enemy_pool.live:
+        enemy.snapshot()
     hero.update(dt, SOLID_RECTS)
-    for enemy in enemies:
+    NAV_GRAPH.advance(NAV_SEARCH_BUDGET)
+    for enemy in enemy_pool.live:
         enemy.update(dt, hero)
+    if game_mode == MODE_ENDLESS:
+        spawner.update(dt, hero)
     hero_attack_check()
     hero_damage_check()
+    particles.update(dt)
     if hero.actor.top > HEIGHT + 80:
         took, lost = hero.take_hit()
         if took and lost and hero.lives == 0:
@@ -816,8 +2145,7 @@ def on_mouse_down(pos, button):
     global state
     if state in {STATE_VICTORY, STATE_GAME_OVER}:
         if button == mouse.LEFT and overlay_button.collidepoint(pos):
-            reset_world(full=True)
-            state = STATE_PLAY
+            start_game()
         return
     if state != STATE_MENU or button != mouse.LEFT:
         return
@@ -826,6 +2154,8 @@ def on_mouse_down(pos, button):
             play_sound(SFX_CLICK, force=True)
             if entry["action"] == "start":
                 start_game()
+            elif entry["action"] == "mode":
+                toggle_mode()
             elif entry["action"] == "sound":
                 toggle_audio()
             elif entry["action"] == "exit":
@@ -836,14 +2166,15 @@ def on_mouse_down(pos, button):
 
 
 def on_key_down(key):
-    global state
+    if key == keys.F9:
+        recorder.toggle(screen.surface)
+        return
     if state == STATE_MENU and key == keys.RETURN:
         play_sound(SFX_CLICK, force=True)
         start_game()
     elif state in {STATE_VICTORY, STATE_GAME_OVER}:
         if key == keys.RETURN:
-            reset_world(full=True)
-            state = STATE_PLAY
+            start_game()
         elif key == keys.ESCAPE:
             return_to_menu()
     elif state == STATE_PLAY:
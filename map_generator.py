@@ -0,0 +1,137 @@
+import argparse
+import random
+import sys
+import time
+
+SOLID = "1"
+EMPTY = "."
+HERO = "P"
+ENEMY = "E"
+
+MIN_COLS = 8
+MIN_ROWS = 6
+PLATFORM_SPACING = 3
+PLATFORM_RUN = (3, 8)
+PLATFORM_GAP = (2, 6)
+
+
+def platform_rows(rows):
+    floor = rows - 1
+    result = set()
+    row = floor - PLATFORM_SPACING
+    while row >= PLATFORM_SPACING:
+        result.add(row)
+        row -= PLATFORM_SPACING
+    return result
+
+
+def solid_mask(rng, row, cols, rows, platforms):
+    if row == 0 or row == rows - 1:
+        return [True] * cols
+    mask = [False] * cols
+    mask[0] = mask[cols - 1] = True
+    if row not in platforms:
+        return mask
+    limit = cols - 1 - PLATFORM_GAP[0]
+    x = 1 + rng.randint(0, PLATFORM_GAP[1])
+    while x < limit:
+        run = rng.randint(*PLATFORM_RUN)
+        end = min(x + run, limit)
+        if end - x >= 2:
+            for col in range(x, end):
+                mask[col] = True
+        x += run + rng.randint(*PLATFORM_GAP)
+    return mask
+
+
+def check_options(cols, rows, enemy_density):
+    if cols < MIN_COLS or rows < MIN_ROWS:
+        raise ValueError(f"Map must be at least {MIN_COLS}x{MIN_ROWS} tiles.")
+    if not 0.0 <= enemy_density <= 1.0:
+        raise ValueError("Enemy density must be between 0 and 1.")
+
+
+def iter_rows(cols, rows, enemy_density=0.05, seed=None):
+    check_options(cols, rows, enemy_density)
+    rng = random.Random(seed)
+    platforms = platform_rows(rows)
+    hero_row = rows - 2
+    hero_col = cols // 2
+    below = solid_mask(rng, 0, cols, rows, platforms)
+    for row in range(rows):
+        current = below
+        if row + 1 < rows:
+            below = solid_mask(rng, row + 1, cols, rows, platforms)
+        else:
+            below = None
+        chars = []
+        for col in range(cols):
+            if current[col]:
+                chars.append(SOLID)
+            elif row == hero_row and col == hero_col:
+                chars.append(HERO)
+            elif (
+                below is not None
+                and below[col]
+                and abs(col - hero_col) > 2
+                and rng.random() < enemy_density
+            ):
+                chars.append(ENEMY)
+            else:
+                chars.append(EMPTY)
+        if row == hero_row and ENEMY not in chars:
+            chars[1] = ENEMY
+        yield "".join(chars)
+
+
+def generate_map(path, cols, rows, enemy_density=0.05, seed=None):
+    check_options(cols, rows, enemy_density)
+    started = time.perf_counter()
+    written = 0
+    enemies = 0
+    with open(path, "w", encoding="utf-8") as target:
+        for line in iter_rows(cols, rows, enemy_density, seed):
+            target.write(line)
+            target.write("\n")
+            written += len(line) + 1
+            enemies += line.count(ENEMY)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    return {
+        "path": path,
+        "cols": cols,
+        "rows": rows,
+        "enemies": enemies,
+        "bytes": written,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed,
+        "mb_per_second": written / elapsed / 1_000_000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate a seeded, playable map in the map.txt format."
+    )
+    parser.add_argument("output", help="path of the map file to write")
+    parser.add_argument("--cols", type=int, default=32)
+    parser.add_argument("--rows", type=int, default=24)
+    parser.add_argument("--enemy-density", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+    try:
+        stats = generate_map(
+            args.output, args.cols, args.rows, args.enemy_density, args.seed
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    print(
+        f"{stats['path']}: {stats['cols']}x{stats['rows']} tiles, "
+        f"{stats['enemies']} enemies, {stats['bytes']} bytes in "
+        f"{stats['seconds']:.3f}s "
+        f"({stats['rows_per_second']:.0f} rows/s, {stats['mb_per_second']:.2f} MB/s)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())